@@ -1,19 +1,54 @@
+import argparse
 import cv2
+import sys
 import threading
-import queue
 from reachy_mini import ReachyMini
 from reachy_mini.utils import create_head_pose
 
+from src.camera import FRAME_HEIGHT, FRAME_WIDTH, FrameExchange
 from src.pose_detector import yolo_loop
 from src.robot_controller import control_reachy
+from src.utils import LatestSlot, pin_current_thread
 
-def main():
+# Only every Nth frame is drawn and shown, so display work stays off the control path
+DISPLAY_EVERY_N = 3
+
+def stdin_commands(stop_signal: threading.Event, calibrate_event: threading.Event):
+    """
+    Input thread function for headless mode.
+    
+    Reads 'c' (calibrate) and 'q' (quit) commands, each followed by Enter,
+    from stdin in place of OpenCV window key presses.
+    
+    Args:
+        stop_signal: Event to set when 'q' is entered.
+        calibrate_event: Event to set when 'c' is entered.
+    """
+    for line in sys.stdin:
+        command = line.strip().lower()
+
+        if command == 'q':
+            print("'q' entered, stopping all threads...")
+            stop_signal.set()
+            return
+
+        elif command == 'c':
+            print("'c' entered, sending calibration signal...")
+            calibrate_event.set()
+
+def main(headless: bool = False, display_every: int = DISPLAY_EVERY_N):
     """
     Initializes and runs the Reachy Pose Controller application.
     
-    Sets up the robot, communication queues, and worker threads (pose detection
+    Sets up the robot, communication slots, and worker threads (pose detection
     and robot control). Also manages the main UI loop (OpenCV window) for
     displaying video and handling user input.
+    
+    Args:
+        headless: If True, skip the OpenCV window entirely and read
+                  commands from stdin instead.
+        display_every: Draw and show only every Nth frame in the OpenCV
+                       window. Pose data is still forwarded for every frame.
     """
     
     # --- Robot Initialization ---
@@ -27,11 +62,19 @@ def main():
     # Set a default starting position
     mini.goto_target(head=create_head_pose(y=0, mm=True))
 
-    # --- Communication Queues ---
-    # frame_queue: Passes video frames from detector to main thread for display
-    frame_queue = queue.Queue(maxsize=2)
-    # pose_queue: Passes processed pose data from main thread to robot controller
-    pose_queue = queue.Queue(maxsize=10)
+    # Keep the UI on its own core, away from inference and robot control.
+    # Pinned only now, so the SDK's I/O threads don't inherit the UI core.
+    pin_current_thread('ui')
+
+    # --- Communication Slots ---
+    # Each slot holds only the newest value; unread values are overwritten.
+    # pose_data_slot: Passes pose data from detector to main thread
+    pose_data_slot = LatestSlot()
+    # pose_slot: Passes processed pose data from main thread to robot controller
+    pose_slot = LatestSlot()
+    # display: Passes annotated frames from detector to main thread, through
+    # preallocated buffers (None when headless, so nothing is drawn)
+    display = None if headless else FrameExchange((FRAME_HEIGHT, FRAME_WIDTH, 3))
 
     # --- Threading Events ---
     stop_signal = threading.Event()
@@ -46,14 +89,14 @@ def main():
 
     yolo_thread = threading.Thread(
         target=yolo_loop,
-        args=(frame_queue, stop_signal, calibrate_event, pose_zero_offsets),
+        args=(pose_data_slot, stop_signal, calibrate_event, pose_zero_offsets, display, display_every),
         daemon=True,
         name="YOLO_Thread"
     )
 
     consumer_thread = threading.Thread(
         target=control_reachy,
-        args=(mini, pose_queue, stop_signal),
+        args=(mini, pose_slot, stop_signal),
         daemon=True,
         name="Reachy_Thread"
     )
@@ -63,51 +106,74 @@ def main():
 
     # --- MAIN THREAD LOOP (for UI) ---
     print("Starting UI loop in main thread.")
-    print("--- Press 'c' to calibrate hip sway to zero ---")
-    print("--- Press 'q' to quit ---")
+    if headless:
+        threading.Thread(
+            target=stdin_commands,
+            args=(stop_signal, calibrate_event),
+            daemon=True,
+            name="Stdin_Thread"
+        ).start()
+        print("--- Type 'c' + Enter to calibrate hip sway to zero ---")
+        print("--- Type 'q' + Enter to quit ---")
+    else:
+        print("--- Press 'c' to calibrate hip sway to zero ---")
+        print("--- Press 'q' to quit ---")
 
     try:
         while not stop_signal.is_set():
-            try:
-                # Get annotated frame and pose data from the YOLO thread
-                annotated_frame, latest_pose_data = frame_queue.get(timeout=0.1)
+            # Get pose data from the YOLO thread
+            latest_pose_data = pose_data_slot.get(timeout=0.1)
+            if latest_pose_data is None:
+                # No new frame, just keep looping
+                continue
 
-                # Pass pose data to the robot controller thread
-                try:
-                    pose_queue.put_nowait(latest_pose_data)
-                except queue.Full:
-                    # If controller is busy, just drop the data
-                    pass
+            # Pass pose data to the robot controller thread
+            # If controller is busy, this overwrites the unread data
+            pose_slot.put(latest_pose_data)
 
-                cv2.imshow("Reachy Mini Pose Controller", annotated_frame)
+            # --- Display (only frames the detector drew on) ---
+            # The detector publishes a drawn frame before its pose data
+            if headless:
+                continue
+            annotated_frame = display.get(timeout=0)
+            if annotated_frame is None:
+                continue
 
-                # --- User Input ---
-                key = cv2.waitKey(1) & 0xFF
+            cv2.imshow("Reachy Mini Pose Controller", annotated_frame)
 
-                if key == ord('q'):
-                    print("'q' pressed, stopping all threads...")
-                    stop_signal.set()
-                    break
+            # --- User Input ---
+            key = cv2.waitKey(1) & 0xFF
 
-                elif key == ord('c'):
-                    print("'c' pressed, sending calibration signal...")
-                    calibrate_event.set()
+            if key == ord('q'):
+                print("'q' pressed, stopping all threads...")
+                stop_signal.set()
+                break
 
-            except queue.Empty:
-                # No new frame, just keep looping
-                continue
+            elif key == ord('c'):
+                print("'c' pressed, sending calibration signal...")
+                calibrate_event.set()
 
     except KeyboardInterrupt:
         print("KeyboardInterrupt, stopping all threads...")
         stop_signal.set()
 
     # --- Cleanup ---
+    # Joins are bounded so a slow inference can't hang shutdown; the threads
+    # are daemons. The controller gets longer to finish its neutral goto.
     print("Waiting for threads to join...")
-    yolo_thread.join()
-    consumer_thread.join()
-    cv2.destroyAllWindows()
+    yolo_thread.join(timeout=1.0)
+    consumer_thread.join(timeout=3.0)
+    if not headless:
+        cv2.destroyAllWindows()
     print("Program finished.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Mirror your pose on a Reachy Mini robot.")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run without the OpenCV window; type 'c'/'q' + Enter to control.")
+    parser.add_argument("--display-every", type=int, default=DISPLAY_EVERY_N,
+                        help="Show only every Nth frame in the OpenCV window (default: %(default)s).")
+    args = parser.parse_args()
+
+    main(headless=args.headless, display_every=max(1, args.display_every))
\ No newline at end of file
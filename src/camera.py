@@ -0,0 +1,151 @@
+import cv2
+import numpy as np
+import threading
+import time
+from typing import Optional, Tuple
+
+# --- Capture Settings ---
+CAMERA_INDEX = 0
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+
+# A grab() returning faster than this was served from the driver's queue,
+# not the sensor, so the frame is stale and can be skipped.
+BUFFERED_GRAB_SECONDS = 0.001
+# Upper bound on grabs per read, for backends that never block
+MAX_DRAIN_GRABS = 5
+
+class FrameExchange:
+    """
+    Triple-buffered hand-off of camera frames to one consumer.
+    
+    The capture thread decodes into `back` and calls `publish`. `get`
+    returns the newest frame in the consumer's own buffer, which capture
+    never writes to until the consumer's next `get`. Three preallocated
+    buffers rotate, so there's no per-frame allocation and no frame is
+    overwritten while it's still being read.
+    """
+    __slots__ = ('back', '_ready', '_front', '_new_frame', '_lock')
+
+    def __init__(self, shape: Tuple[int, ...]):
+        self.back = np.empty(shape, dtype=np.uint8)
+        self._ready = np.empty(shape, dtype=np.uint8)
+        self._front = np.empty(shape, dtype=np.uint8)
+        self._new_frame = threading.Event()
+        self._lock = threading.Lock()
+
+    def copy_to_back(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Copies `frame` into `back` and returns it, e.g. to draw on before
+        `publish`. `back` is reallocated only if the frame's shape differs.
+        """
+        if self.back.shape != frame.shape:
+            self.back = np.empty_like(frame)
+        np.copyto(self.back, frame)
+        return self.back
+
+    def publish(self):
+        """Publishes the frame in `back`, replacing any unread one."""
+        with self._lock:
+            self.back, self._ready = self._ready, self.back
+            self._new_frame.set()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Waits for a frame newer than the last one returned.
+        
+        The previously returned frame may be overwritten once this is
+        called again, so copy anything that must outlive it.
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait forever.
+            
+        Returns:
+            The newest frame, or None if the timeout expired.
+        """
+        if not self._new_frame.wait(timeout):
+            return None
+        with self._lock:
+            self._new_frame.clear()
+            self._ready, self._front = self._front, self._ready
+            return self._front
+
+def open_camera(index: int = CAMERA_INDEX) -> cv2.VideoCapture:
+    """
+    Opens the webcam configured for low-latency capture.
+    
+    Requests a single-frame driver buffer, MJPEG transport and a fixed
+    640x480 resolution. Backends that don't support a setting ignore it.
+    
+    Args:
+        index: The OpenCV camera index.
+        
+    Returns:
+        The VideoCapture object (check `isOpened()` before use).
+    """
+    cap = cv2.VideoCapture(index)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+    return cap
+
+def frame_shape(cap: cv2.VideoCapture) -> Tuple[int, int, int]:
+    """Returns the (height, width, 3) shape of the frames `cap` delivers."""
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    return height, width, 3
+
+def read_latest(
+    cap: cv2.VideoCapture,
+    buffer: Optional[np.ndarray] = None
+) -> Tuple[bool, Optional[np.ndarray]]:
+    """
+    Reads the freshest available frame, dropping any stale buffered ones.
+    
+    Frames are grabbed without decoding until a grab actually waits on the
+    sensor; only that last frame is decoded with `retrieve()`.
+    
+    Args:
+        cap: An opened VideoCapture.
+        buffer: Optional preallocated array to decode into. It is used
+                in place when its shape matches the frame; otherwise a
+                new array is returned.
+        
+    Returns:
+        A (success, frame) tuple, like `cap.read()`.
+    """
+    for _ in range(MAX_DRAIN_GRABS):
+        t0 = time.monotonic()
+        if not cap.grab():
+            return False, None
+        if time.monotonic() - t0 >= BUFFERED_GRAB_SECONDS:
+            break # This grab waited for a new frame, so it's the latest
+    return cap.retrieve(buffer)
+
+def capture_loop(cap: cv2.VideoCapture, exchange: FrameExchange, stop_event: threading.Event):
+    """
+    Capture thread function.
+    
+    Continuously reads the webcam into `exchange`, so frames keep flowing
+    while the pose model is busy. Frames are decoded in place into the
+    exchange's preallocated back buffer instead of a new array per read.
+    Returns when `stop_event` is set or the camera fails, releasing the
+    camera either way.
+    
+    Args:
+        cap: An opened VideoCapture.
+        exchange: Exchange to publish each new frame to.
+        stop_event: Event to signal when the thread should stop.
+    """
+    try:
+        while not stop_event.is_set():
+            success, frame = read_latest(cap, exchange.back)
+            if not success:
+                print("Error: Failed to read frame.")
+                break
+            # Keep whatever was decoded into, in case the size didn't match
+            exchange.back = frame
+            exchange.publish()
+    finally:
+        cap.release()
@@ -0,0 +1,180 @@
+import cv2
+import numpy as np
+import openvino as ov
+import re
+from openvino.preprocess import ColorFormat, PrePostProcessor
+from typing import List, Tuple
+
+# --- Model Output Layout ---
+# YOLOv8-pose head: 4 box values (cx, cy, w, h) + 1 person score + 17 * (x, y, conf)
+NUM_KEYPOINTS = 17
+BOX_SCORE_COLUMNS = 5
+LETTERBOX_COLOR = (114, 114, 114)
+
+# The pose head module in the ONNX export (yolov8n-pose's last of 23 layers).
+# Its box/keypoint decode arithmetic is kept in float when quantizing, as in
+# Ultralytics' own INT8 export: an int8 grid would snap keypoint coordinates.
+POSE_HEAD_MODULE = "model.22"
+
+def letterbox(frame: np.ndarray, size: int) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resizes a frame to a square model input, preserving aspect ratio.
+
+    Args:
+        frame: A BGR image of shape (H, W, 3).
+        size: The side length of the square model input.
+
+    Returns:
+        A tuple of (padded image, scale ratio, (pad_x, pad_y)) needed to
+        map model coordinates back onto the original frame.
+    """
+    h, w = frame.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = round(w * ratio), round(h * ratio)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    padded = cv2.copyMakeBorder(
+        resized,
+        pad_y, size - new_h - pad_y,
+        pad_x, size - new_w - pad_x,
+        cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR
+    )
+    return padded, ratio, (pad_x, pad_y)
+
+def decode_pose_output(
+    output: np.ndarray,
+    ratio: float,
+    pad: Tuple[int, int],
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.45
+) -> np.ndarray:
+    """
+    Decodes the raw YOLOv8-pose head into per-person keypoints.
+
+    Args:
+        output: The raw head of shape (56, N), one column per anchor.
+        ratio: The scale ratio returned by `letterbox`.
+        pad: The (pad_x, pad_y) offsets returned by `letterbox`.
+        conf_threshold: Minimum person score to keep a detection.
+        iou_threshold: IoU above which overlapping boxes are suppressed.
+
+    Returns:
+        An array of shape (M, 17, 3) with (x, y, conf) keypoints in
+        original frame pixels, ordered by descending person score.
+    """
+    preds = output.T
+    preds = preds[preds[:, 4] > conf_threshold]
+    if len(preds) == 0:
+        return np.empty((0, NUM_KEYPOINTS, 3), dtype=np.float32)
+
+    # NMSBoxes expects top-left (x, y, w, h) boxes
+    boxes = preds[:, :4].copy()
+    boxes[:, :2] -= boxes[:, 2:] / 2
+    keep = cv2.dnn.NMSBoxes(boxes.tolist(), preds[:, 4].tolist(), conf_threshold, iou_threshold)
+    keep = np.asarray(keep, dtype=np.int64).reshape(-1)
+
+    kpts = preds[keep, BOX_SCORE_COLUMNS:].reshape(-1, NUM_KEYPOINTS, 3)
+    kpts[..., 0] = (kpts[..., 0] - pad[0]) / ratio
+    kpts[..., 1] = (kpts[..., 1] - pad[1]) / ratio
+    return kpts
+
+class OpenVINOPoseModel:
+    """
+    YOLOv8-pose inference through an (INT8-quantized) OpenVINO IR.
+
+    Color conversion, layout transposition and scaling to [0, 1] are baked
+    into the compiled graph, so frames are fed as letterboxed uint8 BGR.
+    """
+
+    def __init__(self, model_path: str, device: str = "CPU"):
+        core = ov.Core()
+        model = core.read_model(model_path)
+        self.input_size = model.input(0).get_partial_shape()[2].get_length()
+
+        ppp = PrePostProcessor(model)
+        ppp.input().tensor() \
+            .set_element_type(ov.Type.u8) \
+            .set_layout(ov.Layout("NHWC")) \
+            .set_color_format(ColorFormat.BGR)
+        ppp.input().preprocess() \
+            .convert_element_type(ov.Type.f32) \
+            .convert_color(ColorFormat.RGB) \
+            .scale(255.0)
+        ppp.input().model().set_layout(ov.Layout("NCHW"))
+        model = ppp.build()
+
+        self.compiled = core.compile_model(model, device, {"PERFORMANCE_HINT": "LATENCY"})
+        self.request = self.compiled.create_infer_request()
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Runs pose estimation on a single BGR frame.
+
+        Returns:
+            An array of shape (M, 17, 3) with (x, y, conf) keypoints in
+            frame pixels, ordered by descending person score.
+        """
+        img, ratio, pad = letterbox(frame, self.input_size)
+        self.request.infer({0: img[None]})
+        output = self.request.get_output_tensor(0).data[0]
+        return decode_pose_output(output, ratio, pad)
+
+def quantize_to_int8(onnx_path: str, calibration_frames: List[np.ndarray], output_path: str):
+    """
+    Post-training INT8 quantization of an exported YOLOv8-pose ONNX model.
+
+    Args:
+        onnx_path: Path to the FP32 ONNX export.
+        calibration_frames: Representative BGR frames (e.g. ~100 webcam shots).
+        output_path: Where to write the quantized OpenVINO IR (.xml).
+    """
+    if not calibration_frames:
+        raise ValueError("No calibration frames: check that the webcam delivers frames.")
+
+    import nncf  # Only needed for the one-off export
+
+    model = ov.Core().read_model(onnx_path)
+    size = model.input(0).get_partial_shape()[2].get_length()
+
+    def transform(frame: np.ndarray) -> np.ndarray:
+        # The un-processed ONNX graph expects NCHW float RGB in [0, 1]
+        img, _, _ = letterbox(frame, size)
+        return (img[:, :, ::-1].transpose(2, 0, 1)[None] / 255.0).astype(np.float32)
+
+    quantized = nncf.quantize(
+        model,
+        nncf.Dataset(calibration_frames, transform),
+        preset=nncf.QuantizationPreset.MIXED,
+        subset_size=len(calibration_frames),
+        # Leave the head's decode ops (and the DFL) unquantized
+        ignored_scope=nncf.IgnoredScope(
+            patterns=[
+                rf".*/{re.escape(POSE_HEAD_MODULE)}/.*(Add|Sub|Mul|Div).*",
+                rf".*/{re.escape(POSE_HEAD_MODULE)}/dfl.*",
+            ],
+            types=["Sigmoid"]
+        )
+    )
+    ov.save_model(quantized, output_path)
+
+if __name__ == "__main__":
+    # One-off export: python -m src.openvino_pose
+    from ultralytics import YOLO # type: ignore
+    from .camera import open_camera
+
+    onnx_path = YOLO('yolov8n-pose.pt').export(format='onnx', imgsz=320, half=False)
+
+    print("Capturing 100 calibration frames from the webcam...")
+    # Same capture settings as at runtime, so frames letterbox identically
+    cap = open_camera()
+    frames = []
+    while len(frames) < 100:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(frame)
+    cap.release()
+
+    quantize_to_int8(onnx_path, frames, 'yolov8n-pose-int8.xml')
+    print("Saved yolov8n-pose-int8.xml")
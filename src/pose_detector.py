@@ -1,10 +1,14 @@
 import cv2
+import numpy as np
+import os
 from ultralytics import YOLO # type: ignore
-import queue
 import threading
-from typing import Dict, Optional
+import time
+import torch
+from typing import Optional
 
-from .utils import calculate_angle
+from .camera import FrameExchange, capture_loop, frame_shape, open_camera
+from .utils import LatestSlot, PoseData, arm_angles_and_sway, cpu_layout, draw_skeleton, frame_hash, pin_current_thread
 
 # --- COCO Keypoint Indices ---
 LEFT_SHOULDER = 5
@@ -15,144 +19,241 @@ LEFT_HIP = 11
 RIGHT_HIP = 12
 CONF_THRESHOLD = 0.5
 
+# Keypoints gathered per frame, in row order: hips, shoulders, elbows (L, R)
+TRACKED_KEYPOINTS = np.array([LEFT_HIP, RIGHT_HIP, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW])
+# Rows of (hip, shoulder, elbow) for the left and right arms, used for confidence gating
+ARM_TRIANGLES = np.array([[0, 2, 4], [1, 3, 5]])
+# Row pairs drawn as the preview skeleton: hips, shoulders, torso sides, upper arms
+TRACKED_EDGES = ((0, 1), (2, 3), (0, 2), (1, 3), (2, 4), (3, 5))
+
+# Square model input size; a single full-body webcam subject needs no more,
+# and it costs a quarter of the default 640's FLOPs
+INFERENCE_IMGSZ = 320
+
+# Published for frames with no person in view
+NO_POSE = PoseData(None, None, None)
+
+# Near-identical frames reuse the last keypoints for at most this long
+DUPLICATE_REUSE_SECONDS = 0.3
+
+# INT8 OpenVINO IR produced by `python -m src.openvino_pose`
+INT8_MODEL_PATH = 'yolov8n-pose-int8.xml'
+
+def load_pose_model():
+    """
+    Loads the fastest available pose model.
+    
+    Prefers the INT8-quantized OpenVINO model when it has been exported
+    and OpenVINO is installed, and falls back to the Ultralytics PyTorch
+    model otherwise.
+    """
+    if os.path.exists(INT8_MODEL_PATH):
+        try:
+            # OpenVINO is optional; only import it once there's a model to run
+            from .openvino_pose import OpenVINOPoseModel
+        except ImportError as e:
+            print(f"Found {INT8_MODEL_PATH} but could not load OpenVINO ({e}), using PyTorch model.")
+        else:
+            print(f"Using INT8 OpenVINO model: {INT8_MODEL_PATH}")
+            return OpenVINOPoseModel(INT8_MODEL_PATH)
+    return YOLO('yolov8n-pose.pt')
+
 def yolo_loop(
-    frame_queue: queue.Queue, 
+    pose_data_slot: LatestSlot, 
     stop_event: threading.Event, 
     calibrate_event: threading.Event, 
-    pose_zero_offsets: dict
+    pose_zero_offsets: dict,
+    display: Optional[FrameExchange] = None,
+    display_every: int = 1
 ):
     """
     Producer thread function.
     
     Initializes a YOLOv8-pose model and runs a loop to capture video,
-    perform pose estimation, calculate angles/sway, and put the
-    annotated frame and pose data into the shared queue.
+    perform pose estimation, calculate angles/sway, and put the pose
+    data into the shared slot and annotated frames into `display`.
     
     Args:
-        frame_queue: Queue to put (annotated_frame, pose_data) tuples.
+        pose_data_slot: Slot to put each frame's PoseData into.
         stop_event: Event to signal when the thread should stop.
         calibrate_event: Event to signal when to recalibrate pose.
         pose_zero_offsets: Dictionary to store and update the 'zero'
                            offset for hip sway.
+        display: Exchange to publish annotated frames to, or None to never
+                 draw (headless).
+        display_every: Copy and annotate only every Nth frame for display;
+                       the others only publish their PoseData.
+    """
+    try:
+        _detect_poses(pose_data_slot, stop_event, calibrate_event, pose_zero_offsets,
+                      display, display_every)
+    finally:
+        if not stop_event.is_set():
+            # Setup failed or the loop died; take the rest of the app down with it
+            print("YOLO loop ended unexpectedly, stopping all threads...")
+            stop_event.set()
+        print("YOLO loop stopping.")
+
+def _detect_poses(
+    pose_data_slot: LatestSlot, 
+    stop_event: threading.Event, 
+    calibrate_event: threading.Event, 
+    pose_zero_offsets: dict,
+    display: Optional[FrameExchange],
+    display_every: int
+):
+    """
+    Body of `yolo_loop`. Returns when `stop_event` is set, or early when
+    the model, the camera or capture fails.
     """
     
-    model = YOLO('yolov8n-pose.pt')
+    pin_current_thread('inference')
+    layout = cpu_layout()
+    if layout is not None:
+        # torch sized its thread pool from every core at import; shrink it to
+        # the inference cores so workers don't oversubscribe them
+        torch.set_num_threads(len(layout['inference']))
+    model = load_pose_model()
     
     try:
-        cap = cv2.VideoCapture(0)
+        cap = open_camera()
         if not cap.isOpened():
             print("Error: Could not open video source.")
-            stop_event.set()
             return
     except Exception as e:
         print(f"Error opening camera: {e}")
-        stop_event.set()
         return
 
     print("Starting webcam feed processing...")
 
-    while cap.isOpened() and not stop_event.is_set():
-        success, frame = cap.read()
-        if not success:
-            print("Error: Failed to read frame.")
-            break
+    # TRACKED_KEYPOINTS as a tensor on the model's device, built on first use
+    tracked_index = None
 
-        # Run YOLO model
-        results = model(frame, verbose=False)
-        annotated_frame = results[0].plot()
+    # Hash of the last frame the model ran on, and its keypoints
+    inferred_frame_bits = None
+    inferred_kpts = None
+    last_inference_time = 0.0
 
-        latest_pose_data: Dict[str, Optional[float]] = {
-            "left_arm": None,
-            "right_arm": None,
-            "hip_sway": None,
-        }
+    # Frames processed, to pick out every `display_every`th one for display
+    frame_count = 0
 
-        try:
-            # Get keypoints for the first detected person
-            all_keypoints_data = results[0].keypoints.data.cpu().numpy()
-            if len(all_keypoints_data) == 0:
-                continue # No person detected
-
-            person_kpts = all_keypoints_data[0] # Process only one person
-
-            # --- Get all required keypoints ---
-            l_hip_kpt = person_kpts[LEFT_HIP]
-            r_hip_kpt = person_kpts[RIGHT_HIP]
-            l_shoulder_kpt = person_kpts[LEFT_SHOULDER]
-            r_shoulder_kpt = person_kpts[RIGHT_SHOULDER]
-            l_elbow_kpt = person_kpts[LEFT_ELBOW]
-            r_elbow_kpt = person_kpts[RIGHT_ELBOW]
-
-            # --- Left Arm Angle ---
-            if (l_hip_kpt[2] > CONF_THRESHOLD and
-                l_shoulder_kpt[2] > CONF_THRESHOLD and
-                l_elbow_kpt[2] > CONF_THRESHOLD):
-                
-                l_hip_pos = l_hip_kpt[:2]
-                l_shoulder_pos = l_shoulder_kpt[:2]
-                l_elbow_pos = l_elbow_kpt[:2]
-                
-                latest_pose_data["left_arm"] = calculate_angle(l_hip_pos, l_shoulder_pos, l_elbow_pos)
-                
-                cv2.putText(annotated_frame, f"L: {latest_pose_data['left_arm']:.1f}",
-                            (int(l_shoulder_pos[0]), int(l_shoulder_pos[1] - 10)),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-
-            # --- Right Arm Angle ---
-            if (r_hip_kpt[2] > CONF_THRESHOLD and
-                r_shoulder_kpt[2] > CONF_THRESHOLD and
-                r_elbow_kpt[2] > CONF_THRESHOLD):
-                
-                r_hip_pos = r_hip_kpt[:2]
-                r_shoulder_pos = r_shoulder_kpt[:2]
-                r_elbow_pos = r_elbow_kpt[:2]
-                
-                latest_pose_data["right_arm"] = calculate_angle(r_hip_pos, r_shoulder_pos, r_elbow_pos)
-                
-                cv2.putText(annotated_frame, f"R: {latest_pose_data['right_arm']:.1f}",
-                            (int(r_shoulder_pos[0]), int(r_shoulder_pos[1] - 10)),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            
-            # --- Hip Sway Calculation ---
-            if (l_hip_kpt[2] > CONF_THRESHOLD and
-                r_hip_kpt[2] > CONF_THRESHOLD and
-                l_shoulder_kpt[2] > CONF_THRESHOLD and
-                r_shoulder_kpt[2] > CONF_THRESHOLD):
+    # Ultralytics options; FP16 halves memory traffic and uses Tensor Cores on CUDA
+    use_cuda = torch.cuda.is_available()
+    predict_kwargs = {
+        "imgsz": INFERENCE_IMGSZ,
+        "half": use_cuda,
+        "device": 0 if use_cuda else "cpu",
+        "verbose": False,
+    }
+
+    # Capture runs in its own thread so decoding overlaps with inference
+    latest_frame = FrameExchange(frame_shape(cap))
+    capture_stop = threading.Event()
+    capture_thread = threading.Thread(
+        target=capture_loop,
+        args=(cap, latest_frame, capture_stop),
+        daemon=True,
+        name="Capture_Thread"
+    )
+    capture_thread.start()
+
+    try:
+        while capture_thread.is_alive() and not stop_event.is_set():
+            frame = latest_frame.get(timeout=0.1)
+            if frame is None:
+                continue # No new frame yet
+
+            frame_count += 1
+            show = display is not None and frame_count % display_every == 0
+
+            # Reuse the last keypoints while the scene looks unchanged
+            frame_bits = frame_hash(frame)
+            now = time.monotonic()
+            if frame_bits == inferred_frame_bits and now - last_inference_time < DUPLICATE_REUSE_SECONDS:
+                tracked_kpts = inferred_kpts
+            else:
+                # Run YOLO model
+                if not isinstance(model, YOLO): # OpenVINOPoseModel
+                    all_keypoints_data = model(frame)
+                    tracked_kpts = all_keypoints_data[0, TRACKED_KEYPOINTS] if len(all_keypoints_data) else None
+                else:
+                    results = model(frame, **predict_kwargs)
 
-                l_shoulder_x, r_shoulder_x = l_shoulder_kpt[0], r_shoulder_kpt[0]
-                l_hip_x, r_hip_x = l_hip_kpt[0], r_hip_kpt[0]
+                    # Index on the model's device so only the tracked rows are copied off it
+                    keypoints = results[0].keypoints
+                    if keypoints is None or keypoints.data.shape[0] == 0:
+                        tracked_kpts = None
+                    else:
+                        if tracked_index is None or tracked_index.device != keypoints.data.device:
+                            tracked_index = torch.as_tensor(TRACKED_KEYPOINTS, device=keypoints.data.device)
+                        # .float(): FP16 keypoints (half=True on CUDA) come back as float32
+                        tracked_kpts = keypoints.data[0, tracked_index].float().cpu().numpy()
 
-                shoulder_center_x = (l_shoulder_x + r_shoulder_x) / 2
-                hip_center_x = (l_hip_x + r_hip_x) / 2
+                inferred_frame_bits, inferred_kpts, last_inference_time = frame_bits, tracked_kpts, now
 
-                raw_hip_sway = hip_center_x - shoulder_center_x
-                
+            # Keypoints of the first detected person; rows follow TRACKED_KEYPOINTS
+            if tracked_kpts is None:
+                # No person detected, but keep the preview updating
+                if show:
+                    display.copy_to_back(frame)
+                    display.publish()
+                pose_data_slot.put(NO_POSE)
+                continue
+
+            # Per-frame results, packed into an immutable PoseData below
+            left_arm: Optional[float] = None
+            right_arm: Optional[float] = None
+            hip_sway: Optional[float] = None
+
+            xy = tracked_kpts[:, :2]
+            conf_ok = tracked_kpts[:, 2] > CONF_THRESHOLD
+
+            # --- Arm Angles and Hip Sway (one fused kernel) ---
+            left_angle, right_angle, raw_hip_sway = arm_angles_and_sway(xy)
+
+            arm_ok = conf_ok[ARM_TRIANGLES].all(axis=1)
+            if arm_ok[0]:
+                left_arm = float(left_angle)
+            if arm_ok[1]:
+                right_arm = float(right_angle)
+
+
+            # --- Hip Sway Calibration ---
+            if conf_ok[:4].all(): # Both hips and both shoulders
+                raw_hip_sway = float(raw_hip_sway)
 
                 # Check for calibration signal
                 if calibrate_event.is_set():
                     pose_zero_offsets['hip_sway'] = raw_hip_sway
                     calibrate_event.clear()
                     print(f"--- HIP SWAY CALIBRATED: Zero set to {raw_hip_sway:.1f} pixels ---")                
-                
+            
                 # Calculate and store the final, relative sway
-                final_hip_sway = raw_hip_sway - pose_zero_offsets['hip_sway']
-                latest_pose_data["hip_sway"] = final_hip_sway
+                hip_sway = raw_hip_sway - pose_zero_offsets['hip_sway']
 
-                cv2.putText(annotated_frame, f"Sway: {final_hip_sway:.1f}",
-                            (int(hip_center_x), int(l_hip_kpt[1] - 10)), # Draw near left hip
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+            # --- Overlay: skeleton and labels (displayed frames only) ---
+            if show:
+                # Drawn on the display's preallocated buffer, since capture
+                # reuses `frame` after the next get
+                canvas = display.copy_to_back(frame)
+                draw_skeleton(canvas, xy, conf_ok, TRACKED_EDGES)
+                for side, (label, angle) in enumerate((("L", left_angle), ("R", right_angle))):
+                    if arm_ok[side]:
+                        shoulder_x, shoulder_y = xy[ARM_TRIANGLES[side, 1]]
+                        cv2.putText(canvas, f"{label}: {angle:.1f}", (int(shoulder_x), int(shoulder_y - 10)),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                if hip_sway is not None:
+                    hip_center_x = (xy[0, 0] + xy[1, 0]) * 0.5
+                    cv2.putText(canvas, f"Sway: {hip_sway:.1f}", (int(hip_center_x), int(xy[0, 1] - 10)),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2) # Draw near left hip
+                display.publish()
 
-        except Exception as e:  # noqa: F841
-            # print(f"Error during keypoint processing: {e}") # Uncomment for debugging
-            pass
+            # --- Publish data for the main thread ---
+            # If main thread is slow, this overwrites the unread data
+            # PoseData is immutable, so it can be shared without a copy
+            pose_data_slot.put(PoseData(left_arm, right_arm, hip_sway))
 
-        # --- Put data in the queue for the main thread ---
-        try:
-            frame_queue.put_nowait((annotated_frame, latest_pose_data.copy()))
-        except queue.Full:
-            # If main thread is slow, drop the frame
-            pass
-
-    # Release resources
-    cap.release()
-    print("YOLO loop stopping.")
\ No newline at end of file
+    finally:
+        # Stop capture even if the loop raised; capture_loop releases the camera
+        capture_stop.set()
+        capture_thread.join(timeout=1.0)
@@ -1,93 +1,164 @@
-import numpy as np
-import queue
+import functools
 import math
 import threading
+from typing import List, Optional, Tuple
 from reachy_mini import ReachyMini
 from reachy_mini.utils import create_head_pose
 
+from .utils import LatestSlot, PoseData, pin_current_thread
+
 # --- Mapping Parameters ---
 # Map hip sway (in pixels) to the head's lateral movement (in mm)
 # Adjust SWAY_PIXEL_MAX based on your camera and distance
 SWAY_PIXEL_MAX = 80  # Max pixel offset left/right
 HEAD_Y_MM_MAX = 35   # Max head movement left/right in mm
 
-# Map pixel range to head mm range
-# Note: We invert the head range to "mirror" you.
+# Linear map from pixel sway to head mm (before clipping)
+# Note: The scale is negative to "mirror" you.
 # Your move right (positive pixels) = Reachy's head right (negative mm)
-SWAY_INPUT_RANGE = [-SWAY_PIXEL_MAX, SWAY_PIXEL_MAX]
-HEAD_OUTPUT_RANGE = [HEAD_Y_MM_MAX, -HEAD_Y_MM_MAX] # Mirrored
+SWAY_TO_HEAD_SCALE = -HEAD_Y_MM_MAX / SWAY_PIXEL_MAX # Mirrored
+
+# Head commands are rounded to this step (finer than the robot resolves),
+# so the whole +/-35mm range needs only ~140 distinct head poses
+HEAD_Y_STEP_MM = 0.5
+
+# --- Smoothing Parameters ---
+# Exponential moving average weight given to each new measurement
+EMA_ALPHA = 0.3
+# Commands closer than this to the last one sent are skipped
+HEAD_DEADBAND_MM = 0.3
+ANTENNA_DEADBAND_RAD = 0.02
+
+def _ema(average: Optional[float], value: float) -> float:
+    """Folds a new measurement into an exponential moving average."""
+    if average is None:
+        return value # Start from the first measurement
+    return average + EMA_ALPHA * (value - average)
+
+@functools.lru_cache(maxsize=256)
+def _cached_head_pose(y_steps: int):
+    """
+    Returns the head pose for a lateral offset of `y_steps * HEAD_Y_STEP_MM`
+    mm, building each pose only once.
+    
+    The same array is returned on every call, so it is made read-only:
+    an in-place change would otherwise corrupt the cache.
+    """
+    pose = create_head_pose(y=y_steps * HEAD_Y_STEP_MM, mm=True)
+    pose.setflags(write=False)
+    return pose
+
+class CommandSmoother:
+    """
+    Turns per-frame pose data into smoothed robot commands.
+    
+    Measurements are folded into exponential moving averages, seeded from
+    the first sample. Fields that are None keep the last command. A command
+    is only returned once it moves past the deadband from the last one
+    returned, which is then taken as sent.
+    """
+    __slots__ = ('ema_sway', 'ema_left_arm', 'ema_right_arm', 'sent_head_y', 'sent_antennas')
+
+    def __init__(self):
+        # Smoothed measurements (None until the first one arrives)
+        self.ema_sway: Optional[float] = None
+        self.ema_left_arm: Optional[float] = None
+        self.ema_right_arm: Optional[float] = None
+
+        # The last commands sent, to keep when new data is missing
+        self.sent_head_y = 0.0
+        self.sent_antennas = [0.0, 0.0]  # Neutral antenna position (straight up)
+
+    def update(self, pose_data: PoseData) -> Optional[Tuple[float, List[float]]]:
+        """
+        Folds in one frame's pose data.
+        
+        Args:
+            pose_data: The newest PoseData.
+            
+        Returns:
+            A (head_y_mm, [left, right] antenna radians) command to send, or
+            None if it would barely differ from the last one.
+        """
+        new_head_y = self.sent_head_y
+        new_antennas = self.sent_antennas
+
+        # --- 1. Update Head Command ---
+        if pose_data.hip_sway is not None:
+            self.ema_sway = _ema(self.ema_sway, pose_data.hip_sway)
+
+            # Map the relative pixel sway to head Y-position in mm
+            head_y_cmd = self.ema_sway * SWAY_TO_HEAD_SCALE
+            # Clip the value to ensure it's within safe limits
+            new_head_y = max(-HEAD_Y_MM_MAX, min(HEAD_Y_MM_MAX, head_y_cmd))
+            
+        # --- 2. Update Antenna Commands ---
+        if pose_data.left_arm is not None and pose_data.right_arm is not None:
+            self.ema_left_arm = _ema(self.ema_left_arm, pose_data.left_arm)
+            self.ema_right_arm = _ema(self.ema_right_arm, pose_data.right_arm)
+
+            # Invert angles (math.pi - angle) so "arm up" = "antenna up"
+            l_angle_cmd = math.pi - self.ema_left_arm
+            r_angle_cmd = math.pi - self.ema_right_arm
+            
+            # Create the antenna command list
+            new_antennas = [float(-l_angle_cmd), float(r_angle_cmd)]
+
+        # --- 3. Deadband: skip commands that barely moved ---
+        if (abs(new_head_y - self.sent_head_y) < HEAD_DEADBAND_MM and
+            abs(new_antennas[0] - self.sent_antennas[0]) < ANTENNA_DEADBAND_RAD and
+            abs(new_antennas[1] - self.sent_antennas[1]) < ANTENNA_DEADBAND_RAD):
+            return None
+
+        # Store these as the last commands sent
+        self.sent_head_y = new_head_y
+        self.sent_antennas = new_antennas
+        return new_head_y, new_antennas
 
 def control_reachy(
     mini: ReachyMini, 
-    pose_queue: queue.Queue, 
+    pose_slot: LatestSlot, 
     stop_event: threading.Event
 ):
     """
     Consumer thread function.
     
-    Gets pose data from the queue, maps the values to robot commands
-    (head sway, antenna angles), and sends them to the Reachy Mini.
+    Gets pose data from the slot, smooths it, maps the values to robot
+    commands (head sway, antenna angles), and sends them to the Reachy
+    Mini whenever they move past a small deadband.
     
     Args:
         mini: The initialized ReachyMini object.
-        pose_queue: Queue to get (pose_data) dictionaries from.
+        pose_slot: Slot to get PoseData tuples from.
         stop_event: Event to signal when the thread should stop.
     """
+    pin_current_thread('control')
     print("Starting Reachy control loop. Waiting for pose data...")
 
-    # Store the last valid commands to resend if new data isn't available
-    last_head_pose = create_head_pose(y=0, mm=True)
-    last_antennas = [0.0, 0.0]  # Neutral antenna position (straight up)
+    smoother = CommandSmoother()
 
     while not stop_event.is_set():
         try:
             # Get the latest full pose data packet
-            pose_data = pose_queue.get(timeout=0.1)
-            
-            new_head_pose = last_head_pose
-            new_antennas = last_antennas
-
-            # --- 1. Update Head Command ---
-            if pose_data['hip_sway'] is not None:
-                # Map the relative pixel sway to head Y-position in mm
-                head_y_cmd = np.interp(
-                    pose_data['hip_sway'],
-                    SWAY_INPUT_RANGE,
-                    HEAD_OUTPUT_RANGE
-                )
-                # Clip the value to ensure it's within safe limits
-                head_y_cmd = np.clip(head_y_cmd, -HEAD_Y_MM_MAX, HEAD_Y_MM_MAX)
-                
-                # Create the head pose object
-                new_head_pose = create_head_pose(y=head_y_cmd, mm=True)
-                
-            # --- 2. Update Antenna Commands ---
-            if pose_data['left_arm'] is not None and pose_data['right_arm'] is not None:
-                # Invert angles (math.pi - angle) so "arm up" = "antenna up"
-                l_angle_cmd = math.pi - pose_data['left_arm']
-                r_angle_cmd = math.pi - pose_data['right_arm']
-                
-                # Create the antenna command list
-                new_antennas = [float(-l_angle_cmd), float(r_angle_cmd)]
+            pose_data = pose_slot.get(timeout=0.1)
+            if pose_data is None:
+                # No new data.
+                # We could optionally resend the last command to maintain pose,
+                # but for now, we just continue.
+                continue
+
+            command = smoother.update(pose_data)
+            if command is None:
+                continue # Within the deadband
+            head_y, antennas = command
             
-            # --- 3. Send Commands to Reachy ---
+            # --- Send Commands to Reachy ---
             mini.set_target(
-                head=new_head_pose,
-                antennas=new_antennas
+                # Look up the head pose object for the nearest step
+                head=_cached_head_pose(round(head_y / HEAD_Y_STEP_MM)),
+                antennas=antennas
             )
 
-            # Store these as the last valid commands
-            last_head_pose = new_head_pose
-            last_antennas = new_antennas
-            
-            pose_queue.task_done()
-
-        except queue.Empty:
-            # No new data.
-            # We could optionally resend the last command to maintain pose,
-            # but for now, we just continue.
-            continue
-        
         except Exception as e:
             print(f"Error in control loop: {e}")
 
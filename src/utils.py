@@ -1,41 +1,267 @@
+import cv2
+import functools
+import math
 import numpy as np
+import os
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
 
-def calculate_angle(a: np.ndarray | None, b: np.ndarray | None, c: np.ndarray | None) -> float:
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; without it the kernels below run as plain Python
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+# Cores reserved with the `isolcpus` kernel parameter (e.g. "2-3,6")
+ISOLATED_CPUS_PATH = '/sys/devices/system/cpu/isolated'
+
+class PoseData(NamedTuple):
+    """
+    Pose measurements from one frame; None where keypoints weren't confident.
+    
+    Attributes:
+        left_arm: Left hip-shoulder-elbow angle in radians.
+        right_arm: Right hip-shoulder-elbow angle in radians.
+        hip_sway: Calibrated hip sway relative to the shoulders, in pixels.
+    """
+    left_arm: Optional[float]
+    right_arm: Optional[float]
+    hip_sway: Optional[float]
+
+class LatestSlot:
+    """
+    "Latest value" hand-off from one producer to one consumer.
+    
+    `put` never blocks on the consumer and overwrites any value not yet
+    read, so the consumer always gets the newest value instead of a queued
+    backlog. A small lock keeps each store paired with its wake-up, so a
+    value is never returned twice.
+    """
+    __slots__ = ('_value', '_new_value', '_lock')
+
+    def __init__(self):
+        self._value: Any = None
+        self._new_value = threading.Event()
+        self._lock = threading.Lock()
+
+    def put(self, value: Any):
+        """Publishes a value, replacing any unread one."""
+        with self._lock:
+            self._value = value
+            self._new_value.set()
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """
+        Waits for a value newer than the last one returned.
+        
+        Args:
+            timeout: Maximum seconds to wait, or None to wait forever.
+            
+        Returns:
+            The newest value, or None if the timeout expired.
+        """
+        if not self._new_value.wait(timeout):
+            return None
+        # Clear and read together, so the flag always matches the value read
+        with self._lock:
+            self._new_value.clear()
+            return self._value
+
+def parse_cpu_list(cpu_list: str) -> List[int]:
+    """
+    Parses a Linux CPU list string such as "0-2,5" into [0, 1, 2, 5].
+    """
+    cpus = []
+    for part in cpu_list.strip().split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+@functools.lru_cache(maxsize=None)
+def cpu_layout() -> Optional[Dict[str, Set[int]]]:
+    """
+    Assigns CPU cores to the 'ui', 'control' and 'inference' threads.
+    
+    The UI and robot control threads each get one dedicated core, the
+    control thread preferring an isolated one. Inference keeps all other
+    cores, since the model's worker pools inherit its affinity. Computed
+    once, on the first call, before any thread has been pinned.
+    
+    Returns:
+        A role -> cores mapping, or None if pinning is unsupported or
+        there are fewer than three usable cores.
+    """
+    if not hasattr(os, 'sched_getaffinity'):
+        return None # Windows / macOS
+
+    cores = sorted(os.sched_getaffinity(0))
+    try:
+        with open(ISOLATED_CPUS_PATH) as f:
+            isolated = parse_cpu_list(f.read())
+    except (OSError, ValueError):
+        isolated = []
+
+    control = isolated[0] if isolated else (cores[1] if len(cores) > 1 else None)
+    ui = next((c for c in cores if c != control), None)
+    inference = set(cores) - {control, ui}
+    if control is None or ui is None or not inference:
+        return None
+
+    return {'ui': {ui}, 'control': {control}, 'inference': inference}
+
+def pin_current_thread(role: str):
+    """
+    Pins the calling thread to the cores `cpu_layout` assigns to `role`.
+    
+    Keeps latency-sensitive threads from migrating between cores. Does
+    nothing where thread affinity isn't supported.
+    
+    Args:
+        role: One of 'ui', 'control' or 'inference'.
+    """
+    layout = cpu_layout()
+    if layout is None:
+        return
+    try:
+        os.sched_setaffinity(0, layout[role]) # 0 = the calling thread on Linux
+    except OSError as e:
+        print(f"Could not pin {role} thread to cores {sorted(layout[role])}: {e}")
+
+@njit("float64(float64, float64, float64, float64, float64, float64, float64, float64, float64)",
+      cache=True, fastmath=True)
+def angle_kernel(ax, ay, az, bx, by, bz, cx, cy, cz):
+    """
+    Scalar core of `calculate_angle`: the angle at vertex b, in radians.
+    
+    Compiled to native code when numba is installed (eagerly, at import,
+    from the explicit signature). Pass 0.0 for the z coordinates of 2D points.
+    """
+    bax = ax - bx
+    bay = ay - by
+    baz = az - bz
+    bcx = cx - bx
+    bcy = cy - by
+    bcz = cz - bz
+
+    dot_product = bax * bcx + bay * bcy + baz * bcz
+    norm_product = math.sqrt((bax * bax + bay * bay + baz * baz) *
+                             (bcx * bcx + bcy * bcy + bcz * bcz))
+
+    # Handle zero-length vectors to avoid division by zero
+    if norm_product == 0:
+        return 0.0
+
+    # Clip to handle potential floating-point inaccuracies
+    cosine_angle = max(-1.0, min(1.0, dot_product / norm_product))
+
+    return math.acos(cosine_angle)
+
+def calculate_angle(a: Sequence[float], b: Sequence[float], c: Sequence[float]) -> float:
     """
     Calculates the angle (in radians) between three 2D or 3D points at vertex b.
     
     The angle is formed by the vectors ba (from b to a) and bc (from b to c).
+    Unpacks the points and defers to the compiled `angle_kernel`.
     
     Args:
-        a: A numpy array representing point 'a'.
-        b: A numpy array representing point 'b' (the vertex).
-        c: A numpy array representing point 'c'.
+        a: The coordinates of point 'a'.
+        b: The coordinates of point 'b' (the vertex).
+        c: The coordinates of point 'c'.
         
     Returns:
         The angle in radians, or 0.0 if the angle cannot be computed
         (e.g., if vectors have zero length).
     """
-    a = np.array(a)
-    b = np.array(b)
-    c = np.array(c)
+    if len(a) > 2:
+        return angle_kernel(a[0], a[1], a[2], b[0], b[1], b[2], c[0], c[1], c[2])
+    return angle_kernel(a[0], a[1], 0.0, b[0], b[1], 0.0, c[0], c[1], 0.0)
 
-    ba = a - b
-    bc = c - b
-
-    norm_ba = np.linalg.norm(ba)
-    norm_bc = np.linalg.norm(bc)
+def _kernel_input(points: np.ndarray) -> np.ndarray:
+    """
+    Widens half-precision points (e.g. keypoints from an FP16 CUDA model)
+    to float32, since numba has no float16 support.
+    """
+    if points.dtype == np.float16:
+        return points.astype(np.float32)
+    return points
 
-    # Handle zero-length vectors to avoid division by zero
-    if norm_ba == 0 or norm_bc == 0:
-        return 0.0
+@njit(cache=True, fastmath=True)
+def _arm_angles_and_sway(xy: np.ndarray) -> np.ndarray:
+    """Compiled body of `arm_angles_and_sway`."""
+    features = np.empty(3)
+    for side in range(2):
+        hip, shoulder, elbow = xy[side], xy[2 + side], xy[4 + side]
+        features[side] = angle_kernel(hip[0], hip[1], 0.0,
+                                      shoulder[0], shoulder[1], 0.0,
+                                      elbow[0], elbow[1], 0.0)
+    features[2] = (xy[0, 0] + xy[1, 0] - xy[2, 0] - xy[3, 0]) * 0.5
+    return features
 
-    dot_product = np.dot(ba, bc)
+def arm_angles_and_sway(xy: np.ndarray) -> np.ndarray:
+    """
+    Fused per-frame pose kernel: both arm angles and the hip sway in one pass.
     
-    cosine_angle = dot_product / (norm_ba * norm_bc)
+    Args:
+        xy: An array of shape (6, 2) with pixel coordinates in the row order
+            left hip, right hip, left shoulder, right shoulder, left elbow,
+            right elbow.
+        
+    Returns:
+        An array [left_arm, right_arm, raw_hip_sway]: the hip-shoulder-elbow
+        angles in radians, and the hip center x minus the shoulder center x
+        in pixels (before calibration).
+    """
+    return _arm_angles_and_sway(_kernel_input(xy))
+
+# Compile the per-frame kernel for the keypoint dtype and layout (the x, y
+# columns of a (6, 3) keypoint array) now, not on the first frame
+arm_angles_and_sway(np.zeros((6, 3), dtype=np.float32)[:, :2])
+
+def frame_hash(frame: np.ndarray) -> bytes:
+    """
+    Computes a 64-bit perceptual (average) hash of a frame.
     
-    # Clip to handle potential floating-point inaccuracies
-    cosine_angle = np.clip(cosine_angle, -1.0, 1.0)
+    The frame is shrunk to an 8x8 grayscale thumbnail and each pixel is
+    thresholded at the thumbnail's mean, so small noise and compression
+    artifacts leave the hash unchanged while real motion flips bits.
     
-    angle_rad = np.arccos(cosine_angle)
+    Args:
+        frame: A BGR image.
+        
+    Returns:
+        The hash as 8 bytes; equal hashes mean near-identical frames.
+    """
+    small = cv2.resize(frame, (8, 8), interpolation=cv2.INTER_AREA).mean(axis=2)
+    return np.packbits(small > small.mean()).tobytes()
+
+def draw_skeleton(
+    frame: np.ndarray,
+    xy: np.ndarray,
+    visible: np.ndarray,
+    edges: Sequence[Tuple[int, int]]
+) -> np.ndarray:
+    """
+    Draws a keypoint skeleton onto a frame in place.
 
-    return angle_rad
\ No newline at end of file
+    Args:
+        frame: The BGR image to draw on.
+        xy: An array of shape (K, 2) with keypoint pixel coordinates.
+        visible: A boolean array of shape (K,) marking confident keypoints.
+        edges: Pairs of keypoint indices to connect with a line.
+
+    Returns:
+        The same frame, for convenience.
+    """
+    pts = xy.astype(np.int32)
+    for a, b in edges:
+        if visible[a] and visible[b]:
+            cv2.line(frame, (int(pts[a, 0]), int(pts[a, 1])), (int(pts[b, 0]), int(pts[b, 1])), (0, 255, 0), 2)
+    for (x, y), ok in zip(pts, visible):
+        if ok:
+            cv2.circle(frame, (int(x), int(y)), 4, (0, 0, 255), -1)
+    return frame
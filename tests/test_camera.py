@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+import threading
+import time
+from src.camera import MAX_DRAIN_GRABS, FrameExchange, capture_loop, frame_shape, read_latest
+
+class FakeCapture:
+    """Stand-in VideoCapture with `buffered` instant frames, then slow ones."""
+
+    def __init__(self, buffered: int, grab_ok: bool = True):
+        self.buffered = buffered
+        self.grab_ok = grab_ok
+        self.grabs = 0
+        self.retrieves = 0
+        self.released = False
+
+    def grab(self):
+        self.grabs += 1
+        if self.grabs > self.buffered:
+            time.sleep(0.005) # Wait on the "sensor"
+        return self.grab_ok
+
+    def retrieve(self, buffer=None):
+        self.retrieves += 1
+        if buffer is not None:
+            buffer[:] = self.grabs % 256
+            return True, buffer
+        return True, self.grabs
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_WIDTH: 4, cv2.CAP_PROP_FRAME_HEIGHT: 3}.get(prop, 0)
+
+    def release(self):
+        self.released = True
+
+def test_drains_stale_frames():
+    """Tests buffered frames are skipped and only the fresh one is decoded."""
+    cap = FakeCapture(buffered=2)
+    assert read_latest(cap) == (True, 3)
+    assert cap.retrieves == 1
+
+def test_drain_is_bounded():
+    """Tests a backend that never blocks still returns a frame."""
+    cap = FakeCapture(buffered=100)
+    assert read_latest(cap) == (True, MAX_DRAIN_GRABS)
+
+def test_failed_grab():
+    """Tests a failed grab is reported without decoding."""
+    cap = FakeCapture(buffered=0, grab_ok=False)
+    assert read_latest(cap) == (False, None)
+    assert cap.retrieves == 0
+
+def test_capture_loop_releases_on_failure():
+    """Tests the camera is released when reading fails."""
+    cap = FakeCapture(buffered=0, grab_ok=False)
+    capture_loop(cap, FrameExchange(frame_shape(cap)), threading.Event())
+    assert cap.released
+
+def test_read_latest_decodes_in_place():
+    """Tests a matching buffer is decoded into rather than reallocated."""
+    cap = FakeCapture(buffered=0)
+    buffer = np.zeros((3, 4, 3), dtype=np.uint8)
+    success, frame = read_latest(cap, buffer)
+    assert success and frame is buffer
+    assert (buffer == 1).all()
+
+def test_exchange_keeps_held_frame():
+    """Tests further publishes never write into the frame the consumer holds."""
+    exchange = FrameExchange((3, 4, 3))
+    exchange.back[:] = 1
+    exchange.publish()
+    held = exchange.get(timeout=0)
+    for value in range(2, 6):
+        exchange.back[:] = value
+        exchange.publish()
+    assert (held == 1).all()
+    assert (exchange.get(timeout=0) == 5).all()
+    assert exchange.get(timeout=0) is None
+
+def test_copy_to_back_reuses_buffer():
+    """Tests a matching frame is copied into the existing back buffer."""
+    exchange = FrameExchange((3, 4, 3))
+    back = exchange.back
+    frame = np.full((3, 4, 3), 7, dtype=np.uint8)
+    assert exchange.copy_to_back(frame) is back
+    assert (back == 7).all()
+    resized = exchange.copy_to_back(np.zeros((2, 2, 3), dtype=np.uint8))
+    assert resized.shape == (2, 2, 3) and exchange.back is resized
+
+def test_capture_loop_cycles_buffers():
+    """Tests frames are decoded into the exchange's three reused buffers."""
+    cap = FakeCapture(buffered=1000)
+    exchange = FrameExchange(frame_shape(cap))
+    stop_event = threading.Event()
+    frames = []
+
+    def collect():
+        while len(frames) < 5:
+            frame = exchange.get(timeout=1)
+            if frame is None:
+                break
+            frames.append(frame)
+        stop_event.set()
+
+    collector = threading.Thread(target=collect)
+    collector.start()
+    capture_loop(cap, exchange, stop_event)
+    collector.join()
+    assert len(frames) == 5
+    assert len({id(f) for f in frames}) <= 3
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("openvino")
+
+from src.openvino_pose import decode_pose_output, letterbox, quantize_to_int8  # noqa: E402
+
+def _make_detection(cx, cy, w, h, score, kpt_xy):
+    """Builds one raw (56,) head column with all keypoints at kpt_xy."""
+    kpts = np.tile([kpt_xy[0], kpt_xy[1], 0.9], 17)
+    return np.concatenate([[cx, cy, w, h, score], kpts]).astype(np.float32)
+
+def test_letterbox_shape_and_padding():
+    """Tests a landscape frame is scaled down and padded top/bottom."""
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    img, ratio, (pad_x, pad_y) = letterbox(frame, 320)
+    assert img.shape == (320, 320, 3)
+    assert ratio == pytest.approx(0.5)
+    assert (pad_x, pad_y) == (0, 40)
+
+def test_decode_empty_output():
+    """Tests no detections above threshold yields an empty result."""
+    output = np.zeros((56, 2100), dtype=np.float32)
+    assert decode_pose_output(output, 1.0, (0, 0)).shape == (0, 17, 3)
+
+def test_decode_maps_keypoints_to_frame():
+    """Tests keypoints are un-letterboxed back to frame pixels."""
+    output = _make_detection(100, 100, 50, 80, 0.9, (110, 140))[:, None]
+    kpts = decode_pose_output(output, 0.5, (0, 40))
+    assert kpts.shape == (1, 17, 3)
+    assert kpts[0, 0] == pytest.approx([220, 200, 0.9])
+
+def test_decode_suppresses_overlaps():
+    """Tests NMS keeps only the highest-scoring of two overlapping people."""
+    output = np.stack([
+        _make_detection(100, 100, 50, 80, 0.6, (1, 1)),
+        _make_detection(102, 101, 50, 80, 0.9, (2, 2)),
+    ], axis=1)
+    kpts = decode_pose_output(output, 1.0, (0, 0))
+    assert len(kpts) == 1
+    assert kpts[0, 0, 0] == pytest.approx(2)
+
+def test_quantize_requires_calibration_frames():
+    """Tests quantizing without calibration frames fails up front."""
+    with pytest.raises(ValueError, match="calibration frames"):
+        quantize_to_int8("unused.onnx", [], "unused.xml")
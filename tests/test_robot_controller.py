@@ -0,0 +1,54 @@
+import math
+import numpy as np
+import pytest
+
+pytest.importorskip("reachy_mini")
+
+from src.robot_controller import (  # noqa: E402
+    EMA_ALPHA, HEAD_Y_MM_MAX, SWAY_PIXEL_MAX, SWAY_TO_HEAD_SCALE, CommandSmoother, _cached_head_pose
+)
+from src.utils import PoseData  # noqa: E402
+
+def test_cached_head_pose_is_read_only():
+    """Tests the shared cached pose can't be modified in place."""
+    pose = _cached_head_pose(4)
+    assert _cached_head_pose(4) is pose
+    with pytest.raises(ValueError):
+        pose[0, 0] = 2.0
+    assert np.array_equal(pose, _cached_head_pose(4))
+
+def test_smoother_seeds_from_first_sample():
+    """Tests the first measurement is used as-is and sent."""
+    smoother = CommandSmoother()
+    head_y, antennas = smoother.update(PoseData(math.pi / 2, math.pi / 2, 40.0))
+    assert head_y == pytest.approx(40.0 * SWAY_TO_HEAD_SCALE)
+    assert antennas == pytest.approx([-math.pi / 2, math.pi / 2])
+
+def test_smoother_averages_later_samples():
+    """Tests later measurements are blended in with EMA_ALPHA."""
+    smoother = CommandSmoother()
+    assert smoother.update(PoseData(None, None, 0.0)) is None # Seeded at neutral
+    head_y, _ = smoother.update(PoseData(None, None, 40.0))
+    assert head_y == pytest.approx(EMA_ALPHA * 40.0 * SWAY_TO_HEAD_SCALE)
+
+def test_smoother_skips_within_deadband():
+    """Tests commands that barely move are not sent."""
+    smoother = CommandSmoother()
+    assert smoother.update(PoseData(math.pi, math.pi, 0.0)) is None # Already neutral
+    assert smoother.update(PoseData(math.pi, math.pi, 0.1)) is None
+    assert smoother.update(PoseData(math.pi, math.pi, 20.0)) is not None
+
+def test_smoother_clips_head():
+    """Tests the head command stays within its safe range."""
+    smoother = CommandSmoother()
+    head_y, _ = smoother.update(PoseData(None, None, -10 * SWAY_PIXEL_MAX))
+    assert head_y == pytest.approx(HEAD_Y_MM_MAX)
+
+def test_smoother_holds_missing_fields():
+    """Tests None fields keep the last command sent."""
+    smoother = CommandSmoother()
+    head_y, antennas = smoother.update(PoseData(math.pi / 2, math.pi / 2, 40.0))
+    new_head_y, new_antennas = smoother.update(PoseData(None, None, -40.0))
+    assert new_head_y != head_y
+    assert new_antennas == antennas
+    assert smoother.update(PoseData(None, None, None)) is None
@@ -1,7 +1,8 @@
 import numpy as np
 import math
 import pytest
-from src.utils import calculate_angle
+import threading
+from src.utils import LatestSlot, arm_angles_and_sway, calculate_angle, frame_hash, parse_cpu_list
 
 def test_right_angle():
     """Tests a 90-degree angle."""
@@ -36,4 +37,75 @@ def test_3d_angle():
     a = np.array([1, 0, 0])
     b = np.array([0, 0, 0])
     c = np.array([0, 1, 0])
-    assert calculate_angle(a, b, c) == pytest.approx(math.pi / 2)
\ No newline at end of file
+    assert calculate_angle(a, b, c) == pytest.approx(math.pi / 2)
+
+def test_fused_arm_angles_and_sway():
+    """Tests the fused kernel matches calculate_angle and the sway formula."""
+    # Rows: left hip, right hip, left shoulder, right shoulder, left elbow, right elbow
+    xy = np.array([[100, 300], [200, 300], [110, 100], [190, 100], [50, 100], [250, 50]],
+                  dtype=np.float32)
+    left_arm, right_arm, sway = arm_angles_and_sway(xy)
+    assert left_arm == pytest.approx(calculate_angle(xy[0], xy[2], xy[4]))
+    assert right_arm == pytest.approx(calculate_angle(xy[1], xy[3], xy[5]))
+    assert sway == pytest.approx(0.0)
+
+def test_kernels_accept_float16():
+    """Tests the fused kernel accepts half-precision keypoints (FP16 CUDA inference)."""
+    xy = np.array([[100, 300], [200, 300], [110, 100], [190, 100], [50, 100], [250, 50]],
+                  dtype=np.float32)
+    half = xy.astype(np.float16)
+    assert arm_angles_and_sway(half) == pytest.approx(arm_angles_and_sway(xy), abs=1e-3)
+
+def test_latest_slot_keeps_newest():
+    """Tests unread values are overwritten by newer ones."""
+    slot = LatestSlot()
+    slot.put(1)
+    slot.put(2)
+    assert slot.get(timeout=0) == 2
+
+def test_latest_slot_waits_for_new_value():
+    """Tests a value is only returned once."""
+    slot = LatestSlot()
+    assert slot.get(timeout=0) is None
+    slot.put(1)
+    assert slot.get(timeout=0) == 1
+    assert slot.get(timeout=0) is None
+
+def test_latest_slot_put_during_get_is_not_repeated():
+    """Tests a put racing with get() is returned once, not twice."""
+    slot = LatestSlot()
+    racing_puts = []
+
+    class RacingEvent(threading.Event):
+        def clear(self):
+            super().clear()
+            if not racing_puts:
+                # Another put arrives while get() is between clearing and reading
+                racing_puts.append(threading.Thread(target=slot.put, args=(2,)))
+                racing_puts[0].start()
+                racing_puts[0].join(timeout=0.05)
+
+    slot._new_value = RacingEvent()
+    slot.put(1)
+    first = slot.get(timeout=0)
+    racing_puts[0].join()
+    second = slot.get(timeout=1)
+    assert first != second
+    assert second == 2
+
+def test_parse_cpu_list():
+    """Tests ranges, single cores and an empty list."""
+    assert parse_cpu_list("0-2,5\n") == [0, 1, 2, 5]
+    assert parse_cpu_list("3") == [3]
+    assert parse_cpu_list("\n") == []
+
+def test_frame_hash_ignores_noise():
+    """Tests slight noise keeps the hash while a moved object changes it."""
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    frame[:, :320] = 200
+    noisy = frame + np.random.default_rng(0).integers(0, 3, frame.shape, dtype=np.uint8)
+    moved = np.zeros_like(frame)
+    moved[:, 320:] = 200
+    assert len(frame_hash(frame)) == 8
+    assert frame_hash(noisy) == frame_hash(frame)
+    assert frame_hash(moved) != frame_hash(frame)